@@ -11,9 +11,10 @@
 # MIDI output: UART0 TX = GP0 (optional thru)
 
 import machine
-import struct
+import micropython
 import time
 import os
+from collections import OrderedDict
 
 # ---------- Pin configuration ----------
 PIN_I2S_SD  = 26   # DIN  (serial data out)
@@ -25,17 +26,35 @@ PIN_MIDI_RX = 1
 PIN_MIDI_TX = 0
 
 SOUNDS_DIR  = "/sounds_source"
-I2S_BUF     = 4096   # internal I2S ring buffer
-CHUNK       = 1024   # read chunk size
+I2S_MS      = 30     # audio held in the I2S ring (a new note waits behind it)
+BLOCK_MS    = 10     # audio per I2S write; one more block can be queued
+RX_BUF      = 256    # MIDI bytes parsed per UART read
+OPEN_FILES  = 8      # WAV file handles kept open between notes
+DEBUG       = False  # print each Note On (the USB console write adds latency)
+
+# Silence to flush the I2S pipeline (read-only, shared by every Player)
+_SILENCE    = bytes(512)
 
 # ---------- Note name table ----------
 _NAMES = ["C", "Cs", "D", "Ds", "E", "F", "Fs", "G", "Gs", "A", "As", "B"]
 
+# Built once so a Note On costs a tuple index, not a format() allocation
+_MIDI_PATHS = tuple(
+    "{}/{}{}.wav".format(SOUNDS_DIR, _NAMES[n % 12], (n // 12) - 1)
+    for n in range(128)
+)
+
 
 def midi_to_path(note):
     """MIDI note number -> WAV path  (60 = C4.wav, 61 = Cs4.wav, ...)"""
-    octave = (note // 12) - 1
-    return "{}/{}{}.wav".format(SOUNDS_DIR, _NAMES[note % 12], octave)
+    return _MIDI_PATHS[note]
+
+
+@micropython.viper
+def _u8_to_s16(src: ptr8, dst: ptr16, n: int):
+    """Unsigned 8-bit -> signed 16-bit, one native store per sample."""
+    for i in range(n):
+        dst[i] = (int(src[i]) - 128) << 8
 
 
 def parse_wav_header(f):
@@ -55,13 +74,13 @@ def parse_wav_header(f):
         if len(chunk_hdr) < 8:
             break
         cid = chunk_hdr[:4]
-        csz = struct.unpack('<I', chunk_hdr[4:8])[0]
+        csz = int.from_bytes(chunk_hdr[4:8], 'little')
 
         if cid == b'fmt ':
             fmt = f.read(csz)
-            channels  = struct.unpack('<H', fmt[2:4])[0]
-            framerate = struct.unpack('<I', fmt[4:8])[0]
-            sampwidth = struct.unpack('<H', fmt[14:16])[0] // 8
+            channels  = int.from_bytes(fmt[2:4], 'little')
+            framerate = int.from_bytes(fmt[4:8], 'little')
+            sampwidth = int.from_bytes(fmt[14:16], 'little') // 8
             fmt_info = (channels, sampwidth, framerate)
         elif cid == b'data':
             if fmt_info is None:
@@ -75,10 +94,18 @@ def parse_wav_header(f):
 
 class Player:
     def __init__(self):
-        # Detect audio format from the first WAV on flash
+        # Index every WAV on flash; format comes from the first one
         self.sample_rate = 44100
         self.sampwidth = 2
-        self._detect_format()
+        self._index = {}  # path -> (offset, size, is_8bit) of data past the head
+        self._heads = {}  # path -> first block as 16-bit samples in RAM
+        self._files = OrderedDict()  # path -> open file, oldest use first
+        self._index_sounds()
+
+        # Samples per block, from the rate, so the queue stays BLOCK_MS
+        # long at the low rates install_sounds.py compresses to
+        self.chunk = max(64, self.sample_rate * BLOCK_MS // 1000)
+        self._cache_heads()
 
         # I2S output (PCM5101A -- no MCLK needed)
         self.audio = machine.I2S(
@@ -90,7 +117,7 @@ class Player:
             bits=16,
             format=machine.I2S.MONO,
             rate=self.sample_rate,
-            ibuf=I2S_BUF,
+            ibuf=max(512, self.sample_rate * 2 * I2S_MS // 1000),
         )
         print("  I2S  DIN=GP{} BCK=GP{} LRCK=GP{}  {}Hz 16-bit mono".format(
             PIN_I2S_SD, PIN_I2S_SCK, PIN_I2S_WS, self.sample_rate))
@@ -105,121 +132,201 @@ class Player:
         print("  MIDI UART{} RX=GP{} TX=GP{}".format(
             MIDI_UART, PIN_MIDI_RX, PIN_MIDI_TX))
 
-        # Buffers
-        self.buf = bytearray(CHUNK)
-        self.buf16 = bytearray(CHUNK * 2)  # for 8-bit -> 16-bit expansion
+        # Buffers: 8-bit input plus two 16-bit output halves, so one can
+        # be refilled while I2S is still taking data from the other
+        self.buf = bytearray(self.chunk)
+        self.out = (bytearray(self.chunk * 2), bytearray(self.chunk * 2))
+        self._mv = (memoryview(self.out[0]), memoryview(self.out[1]))
+        self.rx = bytearray(RX_BUF)
 
-        # Silence to flush I2S pipeline
-        self.silence = bytearray(512)
+        # Non-blocking I2S: write() queues a buffer and returns at once,
+        # the callback fires when the driver has taken all of it
+        self._busy = False
+        self.audio.irq(self._on_written)
 
-    def _detect_format(self):
-        """Read format from the first WAV file found."""
+    def _index_sounds(self):
+        """Parse each WAV header once so play() can seek straight to the data."""
         try:
             for fn in os.listdir(SOUNDS_DIR):
-                if fn.endswith(".wav"):
-                    with open("{}/{}".format(SOUNDS_DIR, fn), "rb") as f:
-                        info = parse_wav_header(f)
-                    if info:
-                        _, self.sampwidth, self.sample_rate, _ = info
-                        print("  Format: {}Hz {}-bit".format(
-                            self.sample_rate, self.sampwidth * 8))
-                        return
+                if not fn.endswith(".wav"):
+                    continue
+                path = "{}/{}".format(SOUNDS_DIR, fn)
+                with open(path, "rb") as f:
+                    info = parse_wav_header(f)
+                    offset = f.tell()
+                if info is None:
+                    continue
+                _, sw, rate, data_size = info
+                if not self._index:
+                    self.sampwidth, self.sample_rate = sw, rate
+                self._index[path] = (offset, data_size, sw == 1)
         except OSError:
             pass
-        print("  No WAVs found, defaults: {}Hz {}-bit".format(
-            self.sample_rate, self.sampwidth * 8))
+        if self._index:
+            print("  Format: {}Hz {}-bit, {} WAVs indexed".format(
+                self.sample_rate, self.sampwidth * 8, len(self._index)))
+        else:
+            print("  No WAVs found, defaults: {}Hz {}-bit".format(
+                self.sample_rate, self.sampwidth * 8))
+
+    def _cache_heads(self):
+        """Keep the first block of every WAV in RAM, pre-converted to 16-bit.
+
+        play() queues it at once, so a note starts sounding while its file
+        is still being opened; the index entry is moved past the head so
+        _stream carries on from there.
+        """
+        chunk = self.chunk
+        for path, (offset, data_size, is_8bit) in self._index.items():
+            n = min(chunk, data_size if is_8bit else data_size // 2)
+            head = bytearray(n * 2)
+            try:
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    if is_8bit:
+                        raw = f.read(n)
+                        _u8_to_s16(raw, head, len(raw))
+                    else:
+                        f.readinto(head)
+            except OSError:
+                continue
+            used = n if is_8bit else n * 2
+            self._heads[path] = head
+            self._index[path] = (offset + used, data_size - used, is_8bit)
+
+    def _on_written(self, _audio):
+        self._busy = False
+
+    def _queue(self, data):
+        """Hand a buffer to I2S once the previous one has been taken."""
+        while self._busy:
+            machine.idle()
+        self._busy = True
+        self.audio.write(data)
 
     def play(self, path):
-        """Stream a WAV file to I2S.  Aborts early if new MIDI arrives."""
-        try:
-            f = open(path, "rb")
-        except OSError:
+        """Play a WAV file to I2S.  Aborts early if new MIDI arrives."""
+        entry = self._index.get(path)
+        if entry is None:
             return
 
-        info = parse_wav_header(f)
-        if info is None:
-            f.close()
+        head = self._heads.get(path)
+        if head is not None:
+            # Sounds from RAM while the rest is found on flash
+            self._queue(head)
+        self._stream(path, entry)
+
+        # Flush a little silence so the last samples get clocked out
+        self._queue(_SILENCE)
+
+    def _open(self, path):
+        """Return an open handle for path, reusing recently played files."""
+        f = self._files.pop(path, None)
+        if f is None:
+            if len(self._files) >= OPEN_FILES:
+                self._files.pop(next(iter(self._files))).close()
+            f = open(path, "rb")
+        self._files[path] = f
+        return f
+
+    def _stream(self, path, entry):
+        """Stream a WAV from flash, converting 8-bit data on the fly."""
+        offset, remaining, is_8bit = entry
+        try:
+            f = self._open(path)
+        except OSError:
             return
+        f.seek(offset)
 
-        _ch, sw, _rate, data_size = info
-        remaining = data_size
-        is_8bit = (sw == 1)
+        # Bind per-block lookups to locals once
+        uart_any = self.uart.any
+        readinto = f.readinto
+        queue = self._queue
+        buf, out, mvs = self.buf, self.out, self._mv
+        chunk = self.chunk
 
+        # Ping-pong: fill one half while I2S drains the other
+        k = 0
         while remaining > 0:
             # Let new notes interrupt the current one
-            if self.uart.any():
-                break
-
-            n = f.readinto(self.buf, min(CHUNK, remaining))
-            if n == 0:
+            if uart_any():
                 break
 
+            mv = mvs[k]
             if is_8bit:
-                # Unsigned 8-bit -> signed 16-bit
-                for i in range(n):
-                    val = (self.buf[i] - 128) << 8
-                    self.buf16[i * 2] = val & 0xFF
-                    self.buf16[i * 2 + 1] = (val >> 8) & 0xFF
-                self.audio.write(self.buf16[:n * 2])
+                n = readinto(buf, min(chunk, remaining))
+                if n == 0:
+                    break
+                _u8_to_s16(buf, out[k], n)
+                queue(mv[:n * 2])
             else:
-                self.audio.write(self.buf[:n])
+                n = readinto(mv, min(chunk * 2, remaining))
+                if n == 0:
+                    break
+                queue(mv[:n])
 
             remaining -= n
+            k ^= 1
 
-        # Flush a little silence so the last samples get clocked out
-        self.audio.write(self.silence)
-        f.close()
-
+    @micropython.native
     def run(self):
         """Main loop: read MIDI, play WAVs."""
         print("\nReady -- send MIDI notes!")
-        status = 0  # running status
+        status = 0   # running status (0 = none)
+        data1 = -1   # first data byte of a two-byte message, once seen
+
+        # Globals and attributes used per byte or per read, bound once
+        uart_any = self.uart.any
+        uart_readinto = self.uart.readinto
+        sleep_ms = time.sleep_ms
+        play = self.play
+        rx = self.rx
+        paths = _MIDI_PATHS
 
         while True:
-            if not self.uart.any():
-                time.sleep_ms(1)
+            avail = uart_any()
+            if not avail:
+                sleep_ms(1)
                 continue
 
-            b = self.uart.read(1)
-            if b is None:
+            n = uart_readinto(rx, min(avail, RX_BUF))
+            if not n:
                 continue
-            b = b[0]
 
-            if b & 0x80:
-                # Status byte
-                status = b
-                data1 = self.uart.read(1)
-                if data1 is None:
+            # Parse the whole batch.  Parser state carries over, so a
+            # message may be split across reads.  If several notes arrive
+            # together only the last is played, as any of them would have
+            # interrupted the one before.
+            note = -1
+            for i in range(n):
+                b = rx[i]
+                if b >= 0xF8:
+                    continue  # real-time bytes can appear anywhere
+
+                if b & 0x80:
+                    # Channel status sets running status; SysEx and system
+                    # common clear it so their data bytes are skipped
+                    status = b if b < 0xF0 else 0
+                    data1 = -1
                     continue
-                data1 = data1[0] & 0x7F
-            else:
-                # Running status: b is first data byte
-                data1 = b & 0x7F
 
-            msg = status & 0xF0
+                msg = status & 0xF0
+                if msg == 0 or msg in (0xC0, 0xD0):
+                    continue  # no status, or one data-byte message
 
-            if msg in (0x90, 0x80, 0xA0, 0xB0, 0xE0):
-                # Two data-byte messages
-                data2 = self.uart.read(1)
-                if data2 is None:
+                if data1 < 0:
+                    data1 = b
                     continue
-                data2 = data2[0] & 0x7F
-
-                if msg == 0x90 and data2 > 0:
-                    # Note On with velocity
-                    path = midi_to_path(data1)
-                    print("Note {} -> {}".format(data1, path))
-                    self.play(path)
-
-            elif msg in (0xC0, 0xD0):
-                pass  # one data byte already consumed
-
-            elif status == 0xF0:
-                # SysEx: skip until F7
-                while True:
-                    sx = self.uart.read(1)
-                    if sx is None or sx[0] == 0xF7:
-                        break
+
+                if msg == 0x90 and b > 0:
+                    note = data1  # Note On with velocity
+                data1 = -1
+
+            if note >= 0:
+                path = paths[note]
+                if DEBUG:
+                    print("Note {} -> {}".format(note, path))
+                play(path)
 
 
 # ---------- Entry point ----------
@@ -8,13 +8,18 @@ to fit (halve sample rate, then reduce to 8-bit, then both).
 Usage:
     python install_sounds.py              # Install WAV files
     python install_sounds.py --force      # Force re-copy all files
+    python install_sounds.py --verify     # Re-check files on the device by hash
     python install_sounds.py --list       # List WAVs on device
 
 Requirements:
-    pip install mpremote
+    pip install mpremote numpy
 """
 
 import argparse
+import bisect
+import hashlib
+import json
+import mmap
 import os
 import re
 import shutil
@@ -22,13 +27,18 @@ import struct
 import subprocess
 import sys
 import tempfile
-import wave
 from pathlib import Path
 
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
 REPO_ROOT = Path(__file__).resolve().parent
 SOUNDS_DIR = REPO_ROOT / "sounds_source"
 FLASH_TARGET = "/sounds_source"
 FLASH_MARGIN_KB = 20  # keep some headroom
+MANIFEST_NAME = ".manifest"  # on the Pico: {wav name: sha256 of its contents}
+CHUNK_FRAMES = 65536  # frames read, transformed and written per block
+WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")  # canonical 44-byte PCM header
 
 NOTE_PATTERN = re.compile(r"^([A-G])(s?)(\d+)$")
 NOTE_NAMES = ["C", "Cs", "D", "Ds", "E", "F", "Fs", "G", "Gs", "A", "As", "B"]
@@ -39,12 +49,26 @@ TARGET_OCTAVE_HIGH = 6
 
 
 def run(cmd, check=True):
-    """Run a shell command, print it, return result."""
+    """Run a shell command, print it, return result.
+
+    Output is echoed line by line as it arrives, so long copies show
+    progress.  stderr goes to a temp file, so a chatty stderr cannot fill
+    its pipe and stall the process while stdout is being read.
+    """
     print("  $ {}".format(" ".join(cmd)))
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.stdout.strip():
-        for line in result.stdout.strip().splitlines():
-            print("    {}".format(line))
+    lines = []
+    with tempfile.TemporaryFile(mode="w+") as err:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err,
+                                text=True, bufsize=1)
+        for line in proc.stdout:
+            line = line.rstrip()
+            if line:
+                print("    {}".format(line), flush=True)
+                lines.append(line)
+        proc.wait()
+        err.seek(0)
+        result = subprocess.CompletedProcess(
+            cmd, proc.returncode, "\n".join(lines), err.read())
     if result.returncode != 0 and check:
         print("    ERROR: {}".format(result.stderr.strip()))
         sys.exit(1)
@@ -65,124 +89,276 @@ def query_pico(code):
     return result.stdout.strip(), result.returncode
 
 
-def get_flash_free_kb():
-    """Return free KB on Pico internal flash, or None."""
-    out, rc = query_pico(
-        "import os\ns=os.statvfs('/')\nprint(s[0]*s[3]//1024)\n"
-    )
-    try:
-        return int(out.split("\n")[-1].strip())
-    except (ValueError, IndexError):
-        return None
-
-
-def get_remote_file_info(filename):
-    """Get (size, first16hex, last16hex) for a file on the Pico, or None."""
+# Spliced into get_remote_state's exec for --verify: sha256 of every WAV
+_REMOTE_HASH = (
+    "import hashlib,binascii\n"
+    "b=bytearray(4096)\n"
+    "for fn in s:\n"
+    " if fn.endswith('.wav'):\n"
+    "  h=hashlib.sha256()\n"
+    "  with open(d+'/'+fn,'rb') as f:\n"
+    "   while True:\n"
+    "    n=f.readinto(b)\n"
+    "    if not n:\n"
+    "     break\n"
+    "    h.update(memoryview(b)[:n])\n"
+    "  m[fn]=binascii.hexlify(h.digest()).decode()\n"
+)
+
+
+def get_remote_state(verify=False):
+    """Return (free_kb, manifest, sizes) for the Pico, or (None, {}, {}).
+
+    free_kb is the free space on internal flash, manifest is the
+    {name: sha256} written by the last deploy and sizes is {name: bytes}
+    for what is actually in FLASH_TARGET.  Everything comes from one exec,
+    which also creates FLASH_TARGET if it is missing.
+
+    verify: hash every WAV on the Pico and use those hashes in place of the
+    manifest's.  Slow (the Pico reads all of its WAVs), but catches files
+    that were changed or corrupted on the device after they were copied.
+    """
     code = (
-        "import os\n"
+        "import os,json\n"
+        "d='{d}'\n"
+        "try:\n"
+        " os.mkdir(d)\n"
+        "except OSError:\n"
+        " pass\n"
         "try:\n"
-        " s=os.stat('{d}/{fn}')\n"
-        " sz=s[6]\n"
-        " f=open('{d}/{fn}','rb')\n"
-        " first=f.read(16).hex()\n"
-        " f.seek(max(0,sz-16))\n"
-        " last=f.read(16).hex()\n"
-        " f.close()\n"
-        " print(sz,first,last)\n"
+        " m=json.load(open(d+'/{m}'))\n"
         "except:\n"
-        " print('MISSING')\n"
-    ).format(d=FLASH_TARGET, fn=filename)
+        " m={{}}\n"
+        "s={{}}\n"
+        "try:\n"
+        " for fn in os.listdir(d):\n"
+        "  s[fn]=os.stat(d+'/'+fn)[6]\n"
+        "except OSError:\n"
+        " pass\n"
+        "{h}"
+        "v=os.statvfs('/')\n"
+        "print(json.dumps([v[0]*v[3]//1024,m,s]))\n"
+    ).format(d=FLASH_TARGET, m=MANIFEST_NAME, h=_REMOTE_HASH if verify else "")
     out, rc = query_pico(code)
-    line = out.split("\n")[-1].strip()
-    if "MISSING" in line or rc != 0:
-        return None
-    parts = line.split()
-    if len(parts) == 3:
-        return int(parts[0]), parts[1], parts[2]
-    return None
+    if rc != 0:
+        return None, {}, {}
+    try:
+        free_kb, manifest, sizes = json.loads(out.split("\n")[-1])
+    except (ValueError, IndexError):
+        return None, {}, {}
+    return free_kb, manifest, sizes
+
+
+def local_hash(path, st):
+    """sha256 hex digest of a local file whose stat_result is st."""
+    # Hash a read-only mapping: one pass over the page cache, no read calls
+    # (mmap rejects empty files, which just get the empty-input digest)
+    h = hashlib.sha256()
+    if st.st_size:
+        with open(path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            h.update(mm)
+    return h.hexdigest()
 
 
-def get_local_file_info(path):
-    """Get (size, first16hex, last16hex) for a local file."""
-    sz = path.stat().st_size
-    with open(path, "rb") as f:
-        first = f.read(16).hex()
-        f.seek(max(0, sz - 16))
-        last = f.read(16).hex()
-    return sz, first, last
+def read_wav_header(f):
+    """Read a 16-bit PCM WAV header from an open file.
+
+    Returns (channels, sampwidth_bytes, framerate, data_size) and leaves
+    the file positioned at the start of audio data.  Raises ValueError for
+    anything else, since the transforms decode the data as int16.
+    """
+    hdr = f.read(12)
+    if len(hdr) < 12 or hdr[:4] != b"RIFF" or hdr[8:12] != b"WAVE":
+        raise ValueError("{}: not a WAV file".format(f.name))
+    fmt_info = None
+    while True:
+        chunk_hdr = f.read(8)
+        if len(chunk_hdr) < 8:
+            raise ValueError("{}: no data chunk".format(f.name))
+        cid, csz = struct.unpack("<4sI", chunk_hdr)
+        if cid == b"fmt ":
+            fmt = f.read(csz + (csz & 1))
+            if len(fmt) < 16:
+                raise ValueError("{}: short fmt chunk".format(f.name))
+            tag, channels, framerate = struct.unpack_from("<HHI", fmt)
+            bits = struct.unpack_from("<H", fmt, 14)[0]
+            if tag != 1 or bits != 16:
+                raise ValueError("{}: need 16-bit PCM, got format {} at {} bits"
+                                 .format(f.name, tag, bits))
+            fmt_info = (channels, 2, framerate)
+        elif cid == b"data" and fmt_info is not None:
+            return fmt_info + (csz,)
+        else:
+            f.seek(csz + (csz & 1), 1)
+
+
+def _read_frames(f, data_size, nchannels):
+    """Yield int16 (frames, nchannels) chunks of up to CHUNK_FRAMES frames.
+
+    Every chunk is read straight into one preallocated array, so callers
+    must copy what they need (astype does) before taking the next chunk.
+    """
+    buf = np.empty((CHUNK_FRAMES, nchannels), "<i2")
+    view = memoryview(buf).cast("B")
+    frame_bytes = buf.itemsize * nchannels
+    remaining = data_size // frame_bytes
+    while remaining:
+        n = f.readinto(view[:min(remaining, CHUNK_FRAMES) * frame_bytes])
+        n //= frame_bytes
+        if not n:
+            break
+        remaining -= n
+        yield buf[:n]
+
+
+def _write_wav_header(out, nchannels, sampwidth, framerate):
+    """Write a 44-byte PCM WAV header; lengths are patched by _finish_wav."""
+    out.write(WAV_HEADER.pack(
+        b"RIFF", 36, b"WAVE", b"fmt ", 16, 1, nchannels, framerate,
+        framerate * nchannels * sampwidth, nchannels * sampwidth,
+        sampwidth * 8, b"data", 0))
+
+
+def _finish_wav(out, data_len):
+    """Pad odd-length sample data and patch the RIFF and data lengths."""
+    pad = data_len & 1
+    if pad:
+        out.write(b"\0")
+    out.seek(4)
+    out.write(struct.pack("<I", 36 + data_len + pad))
+    out.seek(40)
+    out.write(struct.pack("<I", data_len))
+
+
+def _decimator(factor, nchannels):
+    """Return feed(frames) that low-passes and decimates a stream by factor.
+
+    feed takes int32 (n, nchannels) chunks and returns the decimated int32
+    frames so far; feed(None) flushes the filter at the end of the input.
+    The filter is a Hann-windowed sinc whose stopband starts at the new
+    Nyquist rate (about 44 dB down), centred so output frame k lines up
+    with input frame k * factor.  The last 2 * half input frames carry
+    over between chunks, so output does not depend on the chunk size.
+    """
+    half = 16 * factor
+    cutoff = 0.4375 / factor  # cycles per input frame
+    t = np.arange(-half, half + 1)
+    taps = 2 * cutoff * np.sinc(2 * cutoff * t) * np.hanning(2 * half + 3)[1:-1]
+    taps /= taps.sum()
+    buf = np.zeros((half, nchannels))  # zero padding, then unused input
+    pos = 0  # input frame at the centre of the first window in buf
+
+    def feed(frames):
+        nonlocal buf, pos
+        if frames is None:
+            frames = np.zeros((half, nchannels))
+        buf = np.concatenate((buf, frames))
+        valid = len(buf) - 2 * half  # windows that fit in buf
+        if valid <= 0:
+            return np.empty((0, nchannels), np.int32)
+        windows = sliding_window_view(buf, len(taps), axis=0)
+        out = windows[-pos % factor:valid:factor] @ taps
+        pos += valid
+        buf = buf[valid:]
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int32)
+
+    return feed
+
+
+def _interpolate(frames, factor, prev):
+    """Linearly interpolate factor output frames per input frame.
+
+    Each output run ramps from one input frame toward the next, so the
+    chunk's last frame is returned as the new prev and its run is emitted
+    by the following call (or held flat once the input ends).
+    """
+    frames = np.concatenate((prev, frames))
+    start, end = frames[:-1, None, :], frames[1:, None, :]
+    ramp = np.arange(factor).reshape(1, factor, 1)
+    runs = start + (end - start) * ramp // factor
+    return runs.reshape(-1, frames.shape[1]), frames[-1:]
 
 
 def downsample_wav(src_path, dest_path, decimate=2, eight_bit=False):
     """Downsample a WAV file to reduce size.
 
-    decimate:  factor to reduce sample rate (1=none, 2=halve, 4=quarter)
-    eight_bit: convert 16-bit to 8-bit unsigned
+    decimate:  factor to reduce sample rate (1=none, 2=halve, 4=quarter),
+               low-passed first so high partials don't alias (_decimator)
+    eight_bit: convert 16-bit to 8-bit unsigned, with TPDF dither
     """
-    with wave.open(str(src_path), "rb") as src:
-        params = src.getparams()
-        n_frames = src.getnframes()
-        raw = src.readframes(n_frames)
-
-    n_samples = n_frames * params.nchannels
-    samples = list(struct.unpack("<{}h".format(n_samples), raw))
-
-    # Mono mixdown if stereo
-    if params.nchannels == 2:
-        samples = [
-            (samples[i] + samples[i + 1]) // 2
-            for i in range(0, len(samples), 2)
-        ]
-
-    new_rate = params.framerate
-    if decimate > 1:
-        samples = samples[::decimate]
-        new_rate = params.framerate // decimate
-
-    with wave.open(str(dest_path), "wb") as out:
-        out.setnchannels(1)
+    # Fixed seed: the same source always gives the same bytes, so the
+    # manifest hash still matches and the file is not re-copied
+    rng = np.random.default_rng(0)
+
+    def emit(frames):
+        # Mono mixdown if stereo (floor of the mean)
+        samples = frames.sum(axis=1) // frames.shape[1]
         if eight_bit:
-            out.setsampwidth(1)
-            out.setframerate(new_rate)
-            out.writeframes(bytes((s >> 8) + 128 for s in samples))
-        else:
-            out.setsampwidth(2)
-            out.setframerate(new_rate)
-            out.writeframes(struct.pack("<{}h".format(len(samples)), *samples))
+            # Triangular dither one 8-bit step wide, so truncation leaves
+            # a noise floor rather than harmonics of the note
+            noise = rng.integers(-128, 128, (2, len(samples)), np.int32)
+            samples = np.clip((samples + noise.sum(axis=0)) >> 8, -128, 127)
+            return out.write((samples + 128).astype(np.uint8))
+        return out.write(samples.astype("<i2"))
+
+    with open(src_path, "rb") as src, open(dest_path, "wb") as out:
+        nchannels, _, framerate, data_size = read_wav_header(src)
+        _write_wav_header(out, 1, 1 if eight_bit else 2, framerate // decimate)
+        feed = _decimator(decimate, nchannels) if decimate > 1 else None
+        data_len = 0
+        for frames in _read_frames(src, data_size, nchannels):
+            frames = frames.astype(np.int32)
+            data_len += emit(feed(frames) if feed else frames)
+        if feed:
+            data_len += emit(feed(None))
+        _finish_wav(out, data_len)
 
 
 def octave_shift_wav(src_path, dest_path, octaves):
-    """Generate a WAV by shifting octaves (decimate up, duplicate down)."""
-    with wave.open(str(src_path), "rb") as src:
-        params = src.getparams()
-        n_frames = src.getnframes()
-        raw = src.readframes(n_frames)
-
-    samples = list(struct.unpack("<{}h".format(n_frames * params.nchannels), raw))
-
-    if octaves > 0:
-        for _ in range(octaves):
-            samples = samples[::2]
-    elif octaves < 0:
-        for _ in range(-octaves):
-            expanded = []
-            for s in samples:
-                expanded.append(s)
-                expanded.append(s)
-            samples = expanded
-
-    with wave.open(str(dest_path), "wb") as out:
-        out.setnchannels(params.nchannels)
-        out.setsampwidth(params.sampwidth)
-        out.setframerate(params.framerate)
-        out.writeframes(struct.pack("<{}h".format(len(samples)), *samples))
+    """Generate a WAV by shifting octaves (filter and decimate up,
+    interpolate down)."""
+    factor = 2 ** abs(octaves)
+    with open(src_path, "rb") as src, open(dest_path, "wb") as out:
+        nchannels, _, framerate, data_size = read_wav_header(src)
+        _write_wav_header(out, nchannels, 2, framerate)
+        feed = _decimator(factor, nchannels) if octaves > 0 else None
+        data_len = 0
+        carry = np.empty((0, nchannels), np.int32)
+        for frames in _read_frames(src, data_size, nchannels):
+            frames = frames.astype(np.int32)
+            if feed:
+                frames = feed(frames)
+            elif octaves < 0:
+                frames, carry = _interpolate(frames, factor, carry)
+            data_len += out.write(frames.astype("<i2"))
+        if feed:
+            data_len += out.write(feed(None).astype("<i2"))
+        elif len(carry):
+            tail = np.repeat(carry, factor, axis=0)
+            data_len += out.write(tail.astype("<i2"))
+        _finish_wav(out, data_len)
+
+
+def scan_wavs(directory):
+    """Return {path: stat_result} for the WAV files in directory.
+
+    One os.scandir pass; callers reuse the stat results instead of calling
+    Path.stat() again for every size they need.
+    """
+    with os.scandir(directory) as it:
+        return {Path(e.path): e.stat() for e in it
+                if e.name.endswith(".wav") and e.is_file()}
 
 
 def generate_full_range():
     """Generate WAV files for all notes from octave 2-7 by shifting existing ones.
 
-    Returns list of all WAV files (existing + generated).
+    Returns {path: stat_result} for all WAV files (existing + generated),
+    sorted by path.
     """
-    existing = {p.stem: p for p in SOUNDS_DIR.glob("*.wav")}
+    wavs = scan_wavs(SOUNDS_DIR)
+    existing = {p.stem: p for p in wavs}
 
     # Index existing notes by (name, octave)
     source_index = {}
@@ -192,21 +368,28 @@ def generate_full_range():
             name = m.group(1) + m.group(2)  # e.g. "C", "Cs"
             octave = int(m.group(3))
             source_index.setdefault(name, []).append((octave, path))
+    for candidates in source_index.values():
+        candidates.sort()
 
     generated = 0
     for name in NOTE_NAMES:
         candidates = source_index.get(name, [])
         if not candidates:
             continue
+        octaves = [octave for octave, _ in candidates]
 
         for target_oct in range(TARGET_OCTAVE_LOW, TARGET_OCTAVE_HIGH + 1):
             stem = "{}{}".format(name, target_oct)
             if stem in existing:
                 continue
 
-            # Find closest source octave
-            candidates.sort(key=lambda x: abs(x[0] - target_oct))
-            src_oct, src_path = candidates[0]
+            # Closest source octave: the first one >= target, or the one
+            # below it if that is nearer (ties go to the higher source)
+            i = bisect.bisect_left(octaves, target_oct)
+            if i == len(octaves) or (
+                    i > 0 and target_oct - octaves[i - 1] < octaves[i] - target_oct):
+                i -= 1
+            src_oct, src_path = candidates[i]
             shift = target_oct - src_oct
 
             if abs(shift) > 3:
@@ -218,6 +401,7 @@ def generate_full_range():
                 stem, direction, abs(shift), src_path.stem))
             octave_shift_wav(src_path, dest_path, shift)
             existing[stem] = dest_path
+            wavs[dest_path] = dest_path.stat()
             generated += 1
 
     if generated:
@@ -225,12 +409,12 @@ def generate_full_range():
     else:
         print("  All notes already present")
 
-    return sorted(SOUNDS_DIR.glob("*.wav"))
+    return dict(sorted(wavs.items()))
 
 
-def pick_compression(wav_files, free_kb):
+def pick_compression(total_bytes, free_kb):
     """Decide compression level.  Returns (halve_rate, eight_bit, label) or None if no compression needed."""
-    total_kb = sum(w.stat().st_size for w in wav_files) // 1024
+    total_kb = total_bytes // 1024
     available = free_kb - FLASH_MARGIN_KB
 
     if total_kb <= available:
@@ -247,7 +431,7 @@ def pick_compression(wav_files, free_kb):
     for decimate, eight, label in strategies:
         ratio = decimate * (2 if eight else 1)
         # Use total bytes for more accurate estimate (avoids KB rounding)
-        estimated_bytes = sum(w.stat().st_size for w in wav_files) // ratio
+        estimated_bytes = total_bytes // ratio
         if estimated_bytes // 1024 <= available:
             return decimate, eight, label
 
@@ -273,70 +457,96 @@ def list_remote_sounds():
     run(["mpremote", "exec", code])
 
 
-def deploy(force=False):
-    """Deploy WAV files to Pico flash."""
+def deploy(force=False, verify=False):
+    """Deploy WAV files to Pico flash.
+
+    force:  re-copy every file
+    verify: compare against hashes of the files on the Pico rather than
+            the manifest (see get_remote_state)
+    """
     print("\n== Generating missing octaves ==")
-    wav_files = generate_full_range()
+    wav_stats = generate_full_range()
+    wav_files = list(wav_stats)
     if not wav_files:
         print("  No .wav files in {}".format(SOUNDS_DIR))
         sys.exit(1)
 
-    total_kb = sum(w.stat().st_size for w in wav_files) // 1024
-    free_kb = get_flash_free_kb()
+    total_bytes = sum(st.st_size for st in wav_stats.values())
+    total_kb = total_bytes // 1024
+    # Free space, manifest and remote sizes: one round trip for all three
+    free_kb, manifest, remote_sizes = get_remote_state(verify=verify)
     if free_kb is None:
-        print("  ERROR: Could not query flash free space")
+        print("  ERROR: Could not query the Pico (flash free space)")
         sys.exit(1)
 
     print("  WAV files: {} ({} KB total)".format(len(wav_files), total_kb))
     print("  Flash free: {} KB".format(free_kb))
 
-    compression = pick_compression(wav_files, free_kb)
-    tmpdir = None
-    source_files = wav_files
-
-    if compression is not None:
-        decimate, eight, label = compression
-        print("  Compressing: {}".format(label))
-        tmpdir = Path(tempfile.mkdtemp())
-        source_files = []
-        for wav in wav_files:
-            dest = tmpdir / wav.name
-            downsample_wav(wav, dest, decimate=decimate, eight_bit=eight)
-            source_files.append(dest)
-        comp_kb = sum(f.stat().st_size for f in source_files) // 1024
-        print("  Compressed total: {} KB".format(comp_kb))
-    else:
-        print("  Enough space -- copying at full quality")
-
-    # Create target directory on Pico
-    run(["mpremote", "fs", "mkdir", ":{}".format(FLASH_TARGET)], check=False)
-
-    copied = 0
-    skipped = 0
-    for src in source_files:
-        remote_path = ":{}/{}".format(FLASH_TARGET, src.name)
-        if not force:
-            local_info = get_local_file_info(src)
-            remote_info = get_remote_file_info(src.name)
-            if remote_info and local_info == remote_info:
+    compression = pick_compression(total_bytes, free_kb)
+    # Compressed copies and the manifest are written here; removed on any
+    # exit, including the sys.exit() in run() when a copy fails
+    with tempfile.TemporaryDirectory() as tmp:
+        tmpdir = Path(tmp)
+        source_stats = wav_stats
+
+        if compression is not None:
+            decimate, eight, label = compression
+            print("  Compressing: {}".format(label))
+            source_stats = {}
+            for wav in wav_files:
+                dest = tmpdir / wav.name
+                downsample_wav(wav, dest, decimate=decimate, eight_bit=eight)
+                source_stats[dest] = dest.stat()
+            comp_kb = sum(st.st_size for st in source_stats.values()) // 1024
+            print("  Compressed total: {} KB".format(comp_kb))
+        else:
+            print("  Enough space -- copying at full quality")
+
+        # A file is up to date when the manifest has its hash and the copy on
+        # the Pico is the right size (so deleted or truncated files are redone)
+        hashes = {src.name: local_hash(src, st)
+                  for src, st in source_stats.items()}
+        if force:
+            manifest, remote_sizes = {}, {}
+        old_manifest = dict(manifest)
+
+        to_copy = []
+        skipped = 0
+        for src, st in source_stats.items():
+            size = st.st_size
+            if (not force and manifest.get(src.name) == hashes[src.name]
+                    and remote_sizes.get(src.name) == size):
                 print("  {} -- up to date".format(src.name))
                 skipped += 1
                 continue
-        print("  Copying {} ({} KB)...".format(src.name, src.stat().st_size // 1024), end=" ", flush=True)
-        run(["mpremote", "fs", "cp", str(src), remote_path])
-        print("done")
-        copied += 1
-
-    if tmpdir:
-        shutil.rmtree(tmpdir)
-
-    print("\n  {} copied, {} skipped (up to date)".format(copied, skipped))
+            print("  {} ({} KB) -- to copy".format(src.name, size // 1024))
+            to_copy.append(src)
+
+        # One mpremote session for all copies: the serial connection and raw
+        # REPL are set up once instead of once per file.  The manifest goes
+        # last, so it is only updated once every WAV before it has landed.
+        # After --verify it is always rewritten, since the stored copy may be
+        # the very thing that disagreed with the files.
+        manifest.update(hashes)
+        uploads = list(to_copy)
+        if verify or manifest != old_manifest:
+            manifest_path = tmpdir / MANIFEST_NAME
+            manifest_path.write_text(json.dumps(manifest, sort_keys=True))
+            uploads.append(manifest_path)
+        if uploads:
+            print("  Copying {} files...".format(len(uploads)))
+            run(["mpremote", "fs", "cp"] + [str(src) for src in uploads]
+                + [":{}/".format(FLASH_TARGET)])
+
+    print("\n  {} copied, {} skipped (up to date)".format(len(to_copy), skipped))
 
 
 def main():
     parser = argparse.ArgumentParser(description="Install WAV files to Pico 2 flash")
     parser.add_argument("--force", action="store_true", help="Force re-copy all files")
     parser.add_argument("--list", action="store_true", help="List WAV files on device")
+    parser.add_argument("--verify", action="store_true",
+                        help="Hash the files on the device instead of trusting its manifest")
     args = parser.parse_args()
 
     print("install_sounds -- WAV files to Pico flash")
@@ -349,7 +559,7 @@ def main():
         list_remote_sounds()
         return
 
-    deploy(force=args.force)
+    deploy(force=args.force, verify=args.verify)
     print("\nDone!")
 
 